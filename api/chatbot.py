@@ -2,6 +2,7 @@ import os
 from dotenv import load_dotenv
 from services.storage import JsonStorageService, SupabaseStorageService
 from services.llm import MockLLMService, GeminiLLMService
+from services.jobs import JobQueue
 
 # Load environment variables
 load_dotenv()
@@ -10,6 +11,7 @@ MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
 
 # --- Service Initialization ---
 print(f"DEBUG: Initializing Backend. Mock Mode: {MOCK_MODE}")
@@ -121,3 +123,27 @@ def get_notes():
 
 def delete_note(note_id: int):
     storage_service.delete_note(note_id)
+
+# --- Background Jobs ---
+
+def _generate_note_content(payload: dict):
+    # Errors are raised so the job queue can retry instead of saving a placeholder note
+    return llm_service.generate_study_note(payload["content"], raise_errors=True)
+
+def _save_generated_note(payload: dict, generated_content: str):
+    # Create a short preview
+    summary_preview = generated_content[:150].replace("#", "").strip() + "..." if len(generated_content) > 150 else generated_content
+
+    note = create_note(payload["title"], generated_content, summary_preview)
+    # The note itself lives in notes; the job only keeps a reference to it
+    return {"note_id": note["id"], "title": note["title"], "summary": note["summary"]}
+
+job_queue = JobQueue(storage_service, max_workers=JOB_WORKERS)
+job_queue.register("note", _generate_note_content, finalize=_save_generated_note)
+job_queue.start()
+
+def enqueue_note_job(title: str, content: str):
+    return job_queue.enqueue("note", {"title": title, "content": content})
+
+def get_job(job_id: str):
+    return job_queue.get_job(job_id)
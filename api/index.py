@@ -11,8 +11,12 @@ from chatbot import (
     ask_gemini, load_chat_history, reset_chat_history, 
     generate_flashcards, generate_quiz, generate_study_note,
     get_tasks, create_task, update_task, delete_task, delete_completed_tasks,
-    create_note, get_notes, delete_note
+    get_notes, delete_note,
+    enqueue_note_job, get_job
 )
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 import uuid
 
 app = FastAPI()
@@ -131,14 +135,15 @@ async def remove_task(task_id: int):
 
 # --- Notes & Summarization Endpoints ---
 
-@app.post("/api/notes")
+@app.post("/api/notes", status_code=202)
 async def create_note_endpoint(note: NoteCreate):
-    # Generate a structured study note from the chat transcript
-    generated_content = generate_study_note(note.content)
-    # Create a short preview
-    summary_preview = generated_content[:150].replace("#", "").strip() + "..." if len(generated_content) > 150 else generated_content
-
-    return create_note(note.title, generated_content, summary_preview)
+    # Note generation runs in the background job queue; poll /api/jobs/{job_id} for the result
+    try:
+        job = enqueue_note_job(note.title, note.content)
+    except Exception as e:
+        print(f"Error enqueuing note job: {e}")
+        raise HTTPException(status_code=503, detail="Could not queue note generation")
+    return {"job_id": job["id"], "status": job["status"]}
 
 @app.get("/api/notes")
 async def get_notes_endpoint():
@@ -154,6 +159,37 @@ async def delete_note_endpoint(note_id: int):
     delete_note(note_id)
     return {"status": "success"}
 
+# --- Background Job Endpoints ---
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_endpoint(job_id: uuid.UUID):
+    job = get_job(str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: uuid.UUID):
+    job_id = str(job_id)
+    if not get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_state = None
+        while True:
+            job = await asyncio.to_thread(get_job, job_id)
+            if not job:
+                return
+            state = (job["status"], job.get("attempts"))
+            if state != last_state:
+                last_state = state
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in ("completed", "failed"):
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # --- Weekly Planner Endpoints (Currently not in StorageInterface, leaving as TODO or handling if critical) ---
 # NOTE: Planner events were not moved to StorageInterface in this turn. 
 # Implementing basic Mock handling for Planner if StorageInterface doesn't have it yet would require updating storage.py.
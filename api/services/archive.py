@@ -0,0 +1,100 @@
+from typing import List, Dict, Any, Optional
+import os
+import json
+import gzip
+import hashlib
+import threading
+from datetime import datetime
+
+
+class ConversationArchive:
+    """Cold tier for chat history: one gzip segment per conversation plus a small index.
+
+    Only the index is read at startup; segments are opened when a conversation is asked for.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            self.index = {}
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        except json.JSONDecodeError:
+            self.index = {}
+
+    def _save_index(self):
+        self._write_atomic(self.index_path, json.dumps(self.index, indent=4).encode("utf-8"))
+
+    def _write_atomic(self, path: str, payload: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _segment_path(self, conversation_id: str) -> str:
+        # Conversation IDs come from clients, so they are hashed rather than used as file names
+        digest = hashlib.sha1(conversation_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json.gz")
+
+    def contains(self, conversation_id: str) -> bool:
+        return conversation_id in self.index
+
+    def load(self, conversation_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            if conversation_id not in self.index:
+                return []
+            try:
+                with gzip.open(self._segment_path(conversation_id), "rt", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading archived conversation {conversation_id}: {e}")
+                return []
+
+    def store_many(self, conversations: Dict[str, List[Dict[str, Any]]]):
+        """Writes each conversation into its segment, merging with anything already archived.
+
+        Segments are compressed and written without holding the lock; the index is saved once at the end.
+        """
+        entries = {}
+        for conversation_id, messages in conversations.items():
+            merged = merge_messages(self.load(conversation_id), messages)
+            payload = gzip.compress(json.dumps(merged).encode("utf-8"))
+            self._write_atomic(self._segment_path(conversation_id), payload)
+            entries[conversation_id] = {
+                "messages": len(merged),
+                "last_activity": last_activity(merged),
+                "archived_at": datetime.now().isoformat()
+            }
+        with self._lock:
+            self.index.update(entries)
+            self._save_index()
+
+    def remove(self, conversation_id: str):
+        with self._lock:
+            if self.index.pop(conversation_id, None) is None:
+                return
+            self._save_index()
+            try:
+                os.remove(self._segment_path(conversation_id))
+            except FileNotFoundError:
+                pass
+
+
+def last_activity(messages: List[Dict[str, Any]]) -> Optional[str]:
+    timestamps = [msg["timestamp"] for msg in messages if msg.get("timestamp")]
+    return max(timestamps) if timestamps else None
+
+
+def merge_messages(archived: List[Dict[str, Any]], hot: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # An interrupted archive pass can leave a conversation in both tiers, so duplicates are dropped
+    seen = {(m.get("timestamp"), m.get("role"), m.get("message")) for m in archived}
+    merged = archived + [m for m in hot if (m.get("timestamp"), m.get("role"), m.get("message")) not in seen]
+    return sorted(merged, key=lambda x: x.get("timestamp") or "")
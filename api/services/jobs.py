@@ -0,0 +1,144 @@
+from typing import Callable, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import traceback
+import uuid
+
+from services.storage import StorageInterface
+
+# Job lifecycle: queued -> running -> completed | failed (retried back to queued while attempts remain)
+ACTIVE_STATUSES = ["queued", "running"]
+FINAL_STATUSES = ["completed", "failed"]
+
+
+class JobQueue:
+    """Bounded worker pool for jobs whose state lives in the storage layer.
+
+    Workers claim a job with a compare-and-set in storage and hold it under a lease that is
+    renewed while the handler runs. If an instance is frozen or killed mid-job, the lease
+    expires and the next poll or periodic sweep on any instance picks the job up again, so several
+    instances can share one job table without running a job twice.
+
+    A job type has a handler, which does the slow work from the payload, and an optional
+    finalize step, which persists its output. finalize only runs after the lease has been
+    re-confirmed, so side effects happen once.
+    """
+
+    def __init__(self, storage: StorageInterface, max_workers: int = 2, retry_delay: float = 2.0, lease_seconds: float = 60):
+        self.storage = storage
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._finalizers: Dict[str, Callable[[Dict[str, Any], Any], Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def register(self, job_type: str, handler: Callable[[Dict[str, Any]], Any],
+                 finalize: Optional[Callable[[Dict[str, Any], Any], Any]] = None):
+        self._handlers[job_type] = handler
+        if finalize:
+            self._finalizers[job_type] = finalize
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], max_attempts: int = 3) -> Dict[str, Any]:
+        job = self.storage.create_job(job_type, payload, max_attempts)
+        self._schedule(job["id"])
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.storage.get_job(job_id)
+        # Polling lets this instance take over a job whose worker was frozen; the claim decides who runs it
+        if job and job["status"] in ACTIVE_STATUSES:
+            self._schedule(job_id)
+        return job
+
+    def recover(self):
+        """Schedules unfinished jobs left by earlier processes; only expired leases are actually reclaimed."""
+        for job in self.storage.get_jobs_by_status(ACTIVE_STATUSES):
+            self._schedule(job["id"])
+
+    def start(self):
+        """Starts a sweeper that calls recover() every lease_seconds.
+
+        A job whose worker died is only claimable once its lease expires, which can be well after
+        startup, so a single recover() at boot is not enough.
+        """
+        if self._sweeper:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="job-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._sweeper_stop.set()
+        if self._sweeper:
+            self._sweeper.join()
+            self._sweeper = None
+        self._executor.shutdown(wait=True)
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.recover()
+            except Exception as e:
+                print(f"Error recovering pending jobs: {e}")
+            if self._sweeper_stop.wait(self.lease_seconds):
+                return
+
+    def _schedule(self, job_id: str, delay: float = 0):
+        with self._lock:
+            if job_id in self._scheduled:
+                return
+            self._scheduled.add(job_id)
+        if delay:
+            timer = threading.Timer(delay, self._executor.submit, args=(self._run, job_id))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._executor.submit(self._run, job_id)
+
+    def _heartbeat(self, job_id: str, owner: str, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.storage.renew_job_lease(job_id, owner, self.lease_seconds):
+                return
+
+    def _run(self, job_id: str):
+        retry_in = 0
+        try:
+            owner = str(uuid.uuid4())
+            job = self.storage.claim_job(job_id, owner, self.lease_seconds)
+            if not job:
+                return
+
+            attempts = job["attempts"]
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, owner, stop), daemon=True)
+            heartbeat.start()
+            try:
+                output = self._handlers[job["type"]](job["payload"])
+                # Re-confirm ownership right before side effects so a reclaimed job is not finalized twice
+                if not self.storage.renew_job_lease(job_id, owner, self.lease_seconds):
+                    print(f"Lost lease on job {job_id}, discarding result")
+                    return
+                finalize = self._finalizers.get(job["type"])
+                result = finalize(job["payload"], output) if finalize else output
+            except Exception as e:
+                traceback.print_exc()
+                if attempts < job.get("max_attempts", 1):
+                    self.storage.update_job(job_id, owner=owner, status="queued", error=str(e), locked_until=None)
+                    retry_in = self.retry_delay * attempts
+                else:
+                    self.storage.update_job(job_id, owner=owner, status="failed", error=str(e), payload=None, locked_until=None)
+                return
+            finally:
+                stop.set()
+
+            self.storage.update_job(job_id, owner=owner, status="completed", result=result, payload=None, locked_until=None)
+        except Exception as e:
+            print(f"Error processing job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._scheduled.discard(job_id)
+            if retry_in:
+                self._schedule(job_id, delay=retry_in)
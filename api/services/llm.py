@@ -17,7 +17,7 @@ class LLMInterface(ABC):
         pass
     
     @abstractmethod
-    def generate_study_note(self, text: str) -> str:
+    def generate_study_note(self, text: str, raise_errors: bool = False) -> str:
         pass
 
 class MockLLMService(LLMInterface):
@@ -50,7 +50,7 @@ class MockLLMService(LLMInterface):
             ]
         }
     
-    def generate_study_note(self, text: str) -> str:
+    def generate_study_note(self, text: str, raise_errors: bool = False) -> str:
         return f"# Mock Study Note\n\n## Summary\nThis is a mock summary of the following text:\n\n> {text[:100]}...\n\n- Key Point 1\n- Key Point 2"
 
 class GeminiLLMService(LLMInterface):
@@ -144,7 +144,7 @@ class GeminiLLMService(LLMInterface):
              print(f"Error generating quiz: {e}")
              return {"title": "Error", "questions": []}
 
-    def generate_study_note(self, text: str) -> str:
+    def generate_study_note(self, text: str, raise_errors: bool = False) -> str:
         prompt = f"""
         You are an expert student aid. Convert the following chat transcript into a comprehensive, well-structured study note (Markdown).
         
@@ -163,4 +163,6 @@ class GeminiLLMService(LLMInterface):
             return response.text.strip()
         except Exception as e:
             print(f"Error generating study note: {e}")
+            if raise_errors:
+                raise
             return "Could not generate study note."
@@ -2,8 +2,18 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 import os
 import json
-from datetime import datetime
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
 from supabase import create_client, Client
+from services.archive import ConversationArchive, last_activity, merge_messages
+
+FINISHED_JOB_STATUSES = ["completed", "failed"]
+JOB_RETENTION = timedelta(days=1)
+
+def _utc_iso(value: datetime) -> str:
+    # Lease deadlines are compared across instances (and inside Postgres), so they are always UTC
+    return value.astimezone(timezone.utc).isoformat()
 
 class StorageInterface(ABC):
     @abstractmethod
@@ -50,101 +60,290 @@ class StorageInterface(ABC):
     def delete_note(self, note_id: int):
         pass
 
+    @abstractmethod
+    def create_job(self, job_type: str, payload: Dict[str, Any], max_attempts: int = 3) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Marks a queued job (or a running one whose lease expired) as running for owner; None if someone else holds it."""
+        pass
+
+    @abstractmethod
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        pass
+
+    @abstractmethod
+    def update_job(self, job_id: str, owner: Optional[str] = None, **fields) -> Optional[Dict[str, Any]]:
+        """Updates a job; when owner is given, only while that owner still holds the running job."""
+        pass
+
+    @abstractmethod
+    def get_jobs_by_status(self, statuses: List[str]) -> List[Dict[str, Any]]:
+        pass
+
 class JsonStorageService(StorageInterface):
-    def __init__(self, file_path="local_data.json"):
+    def __init__(self, file_path="local_data.json", archive_idle_days: float = 7, archive_interval: Optional[float] = 3600):
         # On Vercel (or any read-only FS), we can only write to /tmp
         # Check if we are in a serverless environment (often indicated by AWS_LAMBDA_FUNCTION_NAME or VERCEL)
         if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
             self.file_path = f"/tmp/{file_path}"
         else:
             self.file_path = file_path
-            
+
+        # Background job workers and the archiver write from their own threads
+        self._lock = threading.RLock()
         self._load_data()
 
+        # Conversations idle longer than archive_idle_days move out of the hot file into compressed segments
+        self.archive = ConversationArchive(f"{os.path.splitext(self.file_path)[0]}_archive")
+        self.archive_idle = timedelta(days=archive_idle_days)
+        self.archive_interval = archive_interval
+        self._archiver_stop = threading.Event()
+        self._archiver: Optional[threading.Thread] = None
+        # archive_interval=None leaves archiving to explicit archive_idle_conversations() calls
+        if archive_interval:
+            self._archiver = threading.Thread(target=self._archive_loop, name="chat-archiver", daemon=True)
+            self._archiver.start()
+
     def _load_data(self):
         if not os.path.exists(self.file_path):
-            self.data = {"chat_history": [], "tasks": [], "notes": []}
+            self.data = {"chat_history": [], "tasks": [], "notes": [], "jobs": []}
             self._save_data()
         else:
             try:
                 with open(self.file_path, "r") as f:
                     self.data = json.load(f)
             except json.JSONDecodeError:
-                self.data = {"chat_history": [], "tasks": [], "notes": []}
+                self.data = {"chat_history": [], "tasks": [], "notes": [], "jobs": []}
+        self.data.setdefault("jobs", [])
 
     def _save_data(self):
-        with open(self.file_path, "w") as f:
-            json.dump(self.data, f, indent=4)
+        with self._lock:
+            with open(self.file_path, "w") as f:
+                json.dump(self.data, f, indent=4)
+
+    def close(self):
+        """Stops the background archiver."""
+        self._archiver_stop.set()
+        if self._archiver:
+            self._archiver.join()
+            self._archiver = None
+
+    def _archive_loop(self):
+        while True:
+            try:
+                self.archive_idle_conversations()
+            except Exception as e:
+                print(f"Error archiving conversations: {e}")
+            if self._archiver_stop.wait(self.archive_interval):
+                return
+
+    def archive_idle_conversations(self) -> int:
+        """Moves conversations idle past the threshold from the hot file into the archive."""
+        cutoff = (datetime.now() - self.archive_idle).isoformat()
+        with self._lock:
+            conversations: Dict[str, List[Dict[str, Any]]] = {}
+            for msg in self.data["chat_history"]:
+                conversations.setdefault(msg.get("conversation_id"), []).append(msg)
+        idle = {
+            cid: messages for cid, messages in conversations.items()
+            if cid and (last_activity(messages) or "") < cutoff
+        }
+        if not idle:
+            return 0
+
+        # Compression and segment writes happen outside the lock so requests aren't blocked
+        self.archive.store_many(idle)
+
+        archived_ids = {id(msg) for messages in idle.values() for msg in messages}
+        with self._lock:
+            current_ids = {id(msg) for msg in self.data["chat_history"]}
+            for cid, messages in idle.items():
+                # Reset while its segment was being written; don't let it come back from the archive
+                if any(id(msg) not in current_ids for msg in messages):
+                    self.archive.remove(cid)
+            # Only the snapshotted messages move; anything saved during the pass stays hot
+            self.data["chat_history"] = [msg for msg in self.data["chat_history"] if id(msg) not in archived_ids]
+            self._save_data()
+        return len(idle)
+
+    def _restore_conversation(self, conversation_id: str):
+        # New activity makes an archived conversation hot again
+        with self._lock:
+            if not self.archive.contains(conversation_id):
+                return
+            hot = [msg for msg in self.data["chat_history"] if msg.get("conversation_id") != conversation_id]
+            current = [msg for msg in self.data["chat_history"] if msg.get("conversation_id") == conversation_id]
+            self.data["chat_history"] = hot + merge_messages(self.archive.load(conversation_id), current)
+            self._save_data()
+            self.archive.remove(conversation_id)
 
     def save_message(self, role: str, message: str, conversation_id: str):
-        self.data["chat_history"].append({
-            "role": role,
-            "message": message,
-            "conversation_id": conversation_id,
-            "timestamp": datetime.now().isoformat()
-        })
-        self._save_data()
+        with self._lock:
+            self._restore_conversation(conversation_id)
+            self.data["chat_history"].append({
+                "role": role,
+                "message": message,
+                "conversation_id": conversation_id,
+                "timestamp": datetime.now().isoformat()
+            })
+            self._save_data()
 
     def load_chat_history(self, conversation_id: str) -> List[Dict[str, Any]]:
-        return [msg for msg in self.data["chat_history"] if msg.get("conversation_id") == conversation_id]
+        with self._lock:
+            hot = [msg for msg in self.data["chat_history"] if msg.get("conversation_id") == conversation_id]
+            if self.archive.contains(conversation_id):
+                return merge_messages(self.archive.load(conversation_id), hot)
+        return hot
 
     def reset_chat_history(self, conversation_id: str):
-        self.data["chat_history"] = [msg for msg in self.data["chat_history"] if msg.get("conversation_id") != conversation_id]
-        self._save_data()
+        with self._lock:
+            self.data["chat_history"] = [msg for msg in self.data["chat_history"] if msg.get("conversation_id") != conversation_id]
+            self._save_data()
+            self.archive.remove(conversation_id)
         return {"message": "Chat history reset"}
 
     def get_tasks(self) -> List[Dict[str, Any]]:
-        return sorted(self.data["tasks"], key=lambda x: x.get("created_at", ""), reverse=True)
+        with self._lock:
+            return sorted(self.data["tasks"], key=lambda x: x.get("created_at", ""), reverse=True)
 
     def create_task(self, title: str) -> Dict[str, Any]:
-        current_ids = [t["id"] for t in self.data["tasks"]]
-        new_id = max(current_ids) + 1 if current_ids else 1
-        new_task = {
-            "id": new_id,
-            "title": title,
-            "completed": False,
-            "created_at": datetime.now().isoformat()
-        }
-        self.data["tasks"].append(new_task)
-        self._save_data()
+        with self._lock:
+            current_ids = [t["id"] for t in self.data["tasks"]]
+            new_id = max(current_ids) + 1 if current_ids else 1
+            new_task = {
+                "id": new_id,
+                "title": title,
+                "completed": False,
+                "created_at": datetime.now().isoformat()
+            }
+            self.data["tasks"].append(new_task)
+            self._save_data()
         return new_task
 
     def update_task(self, task_id: int, completed: bool) -> Dict[str, Any]:
-        for task in self.data["tasks"]:
-            if task["id"] == task_id:
-                task["completed"] = completed
-                self._save_data()
-                return task
+        with self._lock:
+            for task in self.data["tasks"]:
+                if task["id"] == task_id:
+                    task["completed"] = completed
+                    self._save_data()
+                    return task
         return None
 
     def delete_task(self, task_id: int):
-        self.data["tasks"] = [t for t in self.data["tasks"] if t["id"] != task_id]
-        self._save_data()
+        with self._lock:
+            self.data["tasks"] = [t for t in self.data["tasks"] if t["id"] != task_id]
+            self._save_data()
 
     def delete_completed_tasks(self):
-        self.data["tasks"] = [t for t in self.data["tasks"] if not t["completed"]]
-        self._save_data()
+        with self._lock:
+            self.data["tasks"] = [t for t in self.data["tasks"] if not t["completed"]]
+            self._save_data()
 
     def create_note(self, title: str, content: str, summary: str) -> Dict[str, Any]:
-        current_ids = [n["id"] for n in self.data["notes"]]
-        new_id = max(current_ids) + 1 if current_ids else 1
-        new_note = {
-             "id": new_id,
-             "title": title,
-             "content": content,
-             "summary": summary,
-             "created_at": datetime.now().isoformat()
-        }
-        self.data["notes"].append(new_note)
-        self._save_data()
+        with self._lock:
+            current_ids = [n["id"] for n in self.data["notes"]]
+            new_id = max(current_ids) + 1 if current_ids else 1
+            new_note = {
+                 "id": new_id,
+                 "title": title,
+                 "content": content,
+                 "summary": summary,
+                 "created_at": datetime.now().isoformat()
+            }
+            self.data["notes"].append(new_note)
+            self._save_data()
         return new_note
 
     def get_notes(self) -> List[Dict[str, Any]]:
-        return sorted(self.data["notes"], key=lambda x: x.get("created_at", ""), reverse=True)
+        with self._lock:
+            return sorted(self.data["notes"], key=lambda x: x.get("created_at", ""), reverse=True)
 
     def delete_note(self, note_id: int):
-        self.data["notes"] = [n for n in self.data["notes"] if n["id"] != note_id]
-        self._save_data()
+        with self._lock:
+            self.data["notes"] = [n for n in self.data["notes"] if n["id"] != note_id]
+            self._save_data()
+
+    def create_job(self, job_type: str, payload: Dict[str, Any], max_attempts: int = 3) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        new_job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "lease_owner": None,
+            "locked_until": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        # Finished jobs only matter to pollers, so they are dropped from the hot file after a while
+        expired = (datetime.now() - JOB_RETENTION).isoformat()
+        with self._lock:
+            self.data["jobs"] = [
+                j for j in self.data["jobs"]
+                if j["status"] not in FINISHED_JOB_STATUSES or j.get("updated_at", "") >= expired
+            ]
+            self.data["jobs"].append(new_job)
+            self._save_data()
+        return dict(new_job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for job in self.data["jobs"]:
+                if job["id"] == job_id:
+                    return dict(job)
+        return None
+
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for job in self.data["jobs"]:
+                if job["id"] != job_id:
+                    continue
+                locked_until = job.get("locked_until")
+                lease_expired = not locked_until or datetime.fromisoformat(locked_until) < now
+                if job["status"] == "queued" or (job["status"] == "running" and lease_expired):
+                    job.update(
+                        status="running",
+                        attempts=job.get("attempts", 0) + 1,
+                        lease_owner=owner,
+                        locked_until=_utc_iso(now + timedelta(seconds=lease_seconds)),
+                        updated_at=datetime.now().isoformat()
+                    )
+                    self._save_data()
+                    return dict(job)
+                return None
+        return None
+
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        locked_until = _utc_iso(datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+        return self.update_job(job_id, owner=owner, locked_until=locked_until) is not None
+
+    def update_job(self, job_id: str, owner: Optional[str] = None, **fields) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for job in self.data["jobs"]:
+                if job["id"] == job_id:
+                    if owner is not None and (job.get("lease_owner") != owner or job["status"] != "running"):
+                        return None
+                    job.update(fields)
+                    job["updated_at"] = datetime.now().isoformat()
+                    self._save_data()
+                    return dict(job)
+        return None
+
+    def get_jobs_by_status(self, statuses: List[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [dict(j) for j in self.data["jobs"] if j["status"] in statuses]
+        return sorted(jobs, key=lambda x: x.get("created_at", ""))
 
 
 class SupabaseStorageService(StorageInterface):
@@ -205,3 +404,65 @@ class SupabaseStorageService(StorageInterface):
     
     def delete_note(self, note_id: int):
         self.client.table("notes").delete().eq("id", note_id).execute()
+
+    def create_job(self, job_type: str, payload: Dict[str, Any], max_attempts: int = 3) -> Dict[str, Any]:
+        data = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "status": "queued",
+            "payload": payload,
+            "attempts": 0,
+            "max_attempts": max_attempts
+        }
+        # Finished jobs only matter to pollers, so they are deleted after the same retention as the JSON backend
+        expired = _utc_iso(datetime.now(timezone.utc) - JOB_RETENTION)
+        try:
+            self.client.table("jobs").delete().in_("status", FINISHED_JOB_STATUSES).lt("updated_at", expired).execute()
+        except Exception as e:
+            print(f"Error pruning finished jobs: {e}")
+        response = self.client.table("jobs").insert(data).execute()
+        if not response.data:
+            raise RuntimeError("Failed to create job")
+        return response.data[0]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table("jobs").select("*").eq("id", job_id).execute()
+        return response.data[0] if response.data else None
+
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        job = self.get_job(job_id)
+        if not job:
+            return None
+        now = datetime.now(timezone.utc)
+        # Compare-and-set: the update only matches if nobody claimed the job since it was read
+        response = (
+            self.client.table("jobs")
+            .update({
+                "status": "running",
+                "attempts": job["attempts"] + 1,
+                "lease_owner": owner,
+                "locked_until": _utc_iso(now + timedelta(seconds=lease_seconds)),
+                "updated_at": _utc_iso(now)
+            })
+            .eq("id", job_id)
+            .eq("attempts", job["attempts"])
+            .or_(f"status.eq.queued,and(status.eq.running,locked_until.is.null),and(status.eq.running,locked_until.lt.{_utc_iso(now)})")
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        locked_until = _utc_iso(datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+        return self.update_job(job_id, owner=owner, locked_until=locked_until) is not None
+
+    def update_job(self, job_id: str, owner: Optional[str] = None, **fields) -> Optional[Dict[str, Any]]:
+        fields["updated_at"] = _utc_iso(datetime.now(timezone.utc))
+        query = self.client.table("jobs").update(fields).eq("id", job_id)
+        if owner is not None:
+            query = query.eq("lease_owner", owner).eq("status", "running")
+        response = query.execute()
+        return response.data[0] if response.data else None
+
+    def get_jobs_by_status(self, statuses: List[str]) -> List[Dict[str, Any]]:
+        response = self.client.table("jobs").select("*").in_("status", statuses).order("created_at", desc=False).execute()
+        return response.data
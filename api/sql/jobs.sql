@@ -0,0 +1,18 @@
+-- Background job table used by SupabaseStorageService (see api/services/jobs.py).
+-- Run once in the Supabase SQL editor before deploying the note job queue.
+create table if not exists jobs (
+    id uuid primary key,
+    type text not null,
+    status text not null default 'queued' check (status in ('queued', 'running', 'completed', 'failed')),
+    payload jsonb,
+    result jsonb,
+    error text,
+    attempts integer not null default 0,
+    max_attempts integer not null default 3,
+    lease_owner text,
+    locked_until timestamptz,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists jobs_status_created_at_idx on jobs (status, created_at);
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Mirror index.py: modules under api/ import each other as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage import JsonStorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.delenv("VERCEL", raising=False)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    # Archiving is driven explicitly in tests
+    return JsonStorageService(str(tmp_path / "data.json"), archive_interval=None)
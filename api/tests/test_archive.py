@@ -0,0 +1,126 @@
+import os
+import time
+
+from services.archive import ConversationArchive, merge_messages
+from services.storage import JsonStorageService
+
+
+def add_old_conversation(storage, conversation_id, count=2):
+    for i in range(count):
+        storage.data["chat_history"].append({
+            "role": "user" if i % 2 == 0 else "assistant",
+            "message": f"message {i}",
+            "conversation_id": conversation_id,
+            "timestamp": f"2020-01-01T00:00:0{i}"
+        })
+    storage._save_data()
+
+
+def test_idle_conversation_round_trips_through_archive(storage):
+    add_old_conversation(storage, "old")
+    storage.save_message("user", "hello", "active")
+
+    assert storage.archive_idle_conversations() == 1
+
+    assert [m["conversation_id"] for m in storage.data["chat_history"]] == ["active"]
+    assert storage.archive.contains("old")
+    assert [m["message"] for m in storage.load_chat_history("old")] == ["message 0", "message 1"]
+
+    # A new message brings the conversation back into the hot tier
+    storage.save_message("user", "back again", "old")
+
+    assert not storage.archive.contains("old")
+    assert [m["message"] for m in storage.load_chat_history("old")] == ["message 0", "message 1", "back again"]
+
+
+def test_archive_survives_restart(storage):
+    add_old_conversation(storage, "old")
+    storage.archive_idle_conversations()
+
+    reopened = JsonStorageService(storage.file_path, archive_interval=None)
+
+    assert reopened.data["chat_history"] == []
+    assert len(reopened.load_chat_history("old")) == 2
+
+
+def test_reset_clears_both_tiers(storage):
+    add_old_conversation(storage, "old")
+    storage.archive_idle_conversations()
+    storage.save_message("user", "hot message", "old")
+    add_old_conversation(storage, "other")
+    storage.archive_idle_conversations()
+
+    storage.reset_chat_history("old")
+
+    assert storage.load_chat_history("old") == []
+    assert not storage.archive.contains("old")
+    assert len(storage.load_chat_history("other")) == 2
+
+
+def test_messages_in_both_tiers_are_not_duplicated(storage):
+    add_old_conversation(storage, "old")
+    messages = list(storage.data["chat_history"])
+    storage.archive_idle_conversations()
+    # Simulate a pass interrupted after the segment write but before the hot file was rewritten
+    storage.data["chat_history"].extend(messages)
+
+    assert len(storage.load_chat_history("old")) == 2
+
+    storage.save_message("user", "new", "old")
+
+    assert [m["message"] for m in storage.load_chat_history("old")] == ["message 0", "message 1", "new"]
+
+
+def test_store_many_merges_with_existing_segment(tmp_path):
+    archive = ConversationArchive(str(tmp_path / "archive"))
+    first = {"role": "user", "message": "a", "conversation_id": "c", "timestamp": "2020-01-01T00:00:00"}
+    second = {"role": "user", "message": "b", "conversation_id": "c", "timestamp": "2020-01-02T00:00:00"}
+
+    archive.store_many({"c": [first]})
+    archive.store_many({"c": [first, second]})
+
+    assert archive.load("c") == [first, second]
+    assert archive.index["c"]["messages"] == 2
+    assert archive.index["c"]["last_activity"] == "2020-01-02T00:00:00"
+
+    archive.remove("c")
+
+    assert archive.load("c") == []
+    assert os.listdir(tmp_path / "archive") == ["index.json"]
+
+
+def test_merge_messages_orders_by_timestamp():
+    late = {"role": "user", "message": "late", "timestamp": "2020-01-02T00:00:00"}
+    early = {"role": "user", "message": "early", "timestamp": "2020-01-01T00:00:00"}
+
+    assert merge_messages([late], [early, late]) == [early, late]
+
+
+def test_reset_during_archive_pass_is_not_undone(storage):
+    add_old_conversation(storage, "old")
+    store_many = storage.archive.store_many
+
+    def store_then_reset(conversations):
+        store_many(conversations)
+        storage.reset_chat_history("old")
+
+    storage.archive.store_many = store_then_reset
+    storage.archive_idle_conversations()
+
+    assert storage.load_chat_history("old") == []
+    assert not storage.archive.contains("old")
+
+
+def test_background_archiver_moves_idle_conversations(storage):
+    add_old_conversation(storage, "old")
+    archiving = JsonStorageService(storage.file_path, archive_idle_days=0, archive_interval=0.05)
+    try:
+        deadline = time.time() + 5
+        while archiving.data["chat_history"] and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        archiving.close()
+
+    assert archiving.data["chat_history"] == []
+    assert archiving.archive.contains("old")
+    assert archiving._archiver is None
@@ -0,0 +1,120 @@
+import time
+
+from services.jobs import JobQueue
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.storage.get_job(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_completes_and_drops_payload(storage):
+    queue = JobQueue(storage, retry_delay=0.01)
+    queue.register("echo", lambda payload: payload["value"] * 2, finalize=lambda payload, output: {"value": output})
+
+    job = wait_for(queue, queue.enqueue("echo", {"value": 21})["id"])
+
+    assert job["status"] == "completed"
+    assert job["result"] == {"value": 42}
+    assert job["payload"] is None
+    assert job["attempts"] == 1
+
+
+def test_failed_attempt_is_retried(storage):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 2:
+            raise RuntimeError("boom")
+        return "ok"
+
+    queue = JobQueue(storage, retry_delay=0.01)
+    queue.register("flaky", flaky)
+
+    job = wait_for(queue, queue.enqueue("flaky", {})["id"])
+
+    assert job["status"] == "completed"
+    assert job["attempts"] == 2
+    assert len(calls) == 2
+
+
+def test_job_fails_after_max_attempts(storage):
+    finalized = []
+
+    def always_fails(payload):
+        raise RuntimeError("still broken")
+
+    queue = JobQueue(storage, retry_delay=0.01)
+    queue.register("broken", always_fails, finalize=lambda payload, output: finalized.append(output))
+
+    job = wait_for(queue, queue.enqueue("broken", {"text": "x"}, max_attempts=3)["id"])
+
+    assert job["status"] == "failed"
+    assert job["attempts"] == 3
+    assert job["error"] == "still broken"
+    assert job["payload"] is None
+    assert finalized == []
+
+
+def test_claim_is_exclusive_until_lease_expires(storage):
+    job = storage.create_job("note", {})
+
+    assert storage.claim_job(job["id"], "worker-a", lease_seconds=60)["lease_owner"] == "worker-a"
+    assert storage.claim_job(job["id"], "worker-b", lease_seconds=60) is None
+
+    storage.update_job(job["id"], locked_until="2000-01-01T00:00:00+00:00")
+    reclaimed = storage.claim_job(job["id"], "worker-b", lease_seconds=60)
+
+    assert reclaimed["lease_owner"] == "worker-b"
+    assert reclaimed["attempts"] == 2
+    # The original worker no longer owns the job, so its late result is rejected
+    assert storage.update_job(job["id"], owner="worker-a", status="completed") is None
+    assert storage.get_job(job["id"])["status"] == "running"
+
+
+def test_recover_leaves_jobs_with_live_lease_alone(storage):
+    ran = []
+    job = storage.create_job("note", {})
+    storage.claim_job(job["id"], "other-instance", lease_seconds=60)
+
+    queue = JobQueue(storage)
+    queue.register("note", lambda payload: ran.append(payload))
+    queue.recover()
+    queue.get_job(job["id"])
+    queue.close()
+
+    assert ran == []
+    assert storage.get_job(job["id"])["lease_owner"] == "other-instance"
+
+
+def test_finished_jobs_are_pruned_after_retention(storage):
+    old = storage.create_job("note", {})
+    storage.update_job(old["id"], status="completed")
+    storage.data["jobs"][0]["updated_at"] = "2000-01-01T00:00:00"
+
+    storage.create_job("note", {})
+
+    assert storage.get_job(old["id"]) is None
+
+
+def test_sweeper_reclaims_job_once_dead_workers_lease_expires(storage):
+    job = storage.create_job("note", {})
+    # Claimed by a worker that died; the lease is still live when the queue starts
+    storage.claim_job(job["id"], "dead-worker", lease_seconds=0.3)
+
+    queue = JobQueue(storage, lease_seconds=0.1)
+    queue.register("note", lambda payload: "done")
+    queue.start()
+    try:
+        finished = wait_for(queue, job["id"])
+    finally:
+        queue.close()
+
+    assert finished["status"] == "completed"
+    assert finished["result"] == "done"
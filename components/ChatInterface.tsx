@@ -40,6 +40,18 @@ export default function ChatInterface({ className }: ChatInterfaceProps) {
         }
     }, []);
 
+    // Note generation runs as a background job; poll it until it finishes or fails
+    const waitForJob = async (jobId: string) => {
+        for (let i = 0; i < 150; i++) {
+            await new Promise((resolve) => setTimeout(resolve, 2000));
+            const res = await fetch(`/api/jobs/${jobId}`);
+            if (!res.ok) continue;
+            const job = await res.json();
+            if (job.status === "completed" || job.status === "failed") return job;
+        }
+        return null;
+    };
+
     const sendMessage = async (e?: React.FormEvent) => {
         e?.preventDefault();
         if (!input.trim() || isLoading) return;
@@ -154,7 +166,12 @@ export default function ChatInterface({ className }: ChatInterfaceProps) {
                             try {
                                 const noteContent = messages.map(m => `**${m.role === 'user' ? 'User' : 'Assistant'}**: ${m.message}`).join('\n\n');
                                 const res = await fetch("/api/notes", { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ title: `Study Session - ${new Date().toLocaleString()}`, content: noteContent }), });
-                                if (res.ok) alert("Chat saved as note!");
+                                if (!res.ok) throw new Error(`Server error: ${res.statusText}`);
+                                const { job_id } = await res.json();
+                                const job = await waitForJob(job_id);
+                                if (job?.status === "completed") alert("Chat saved as note!");
+                                else if (job?.status === "failed") alert(`Failed to save note: ${job.error}`);
+                                else alert("Note generation is taking longer than expected. Check your notes later.");
                             } catch (e) { alert("Failed to save note."); }
                         }}
                         className="p-2 text-muted hover:text-primary hover:bg-surface-hover rounded-lg transition-all"